@@ -1,100 +1,141 @@
 import pandas as pd
+import csv
+import json
 import os
 
-def convert_j826_file(input_file, output_file, is_first_file):
+# Columns of Appended_Print_J826.csv, in order
+_OUTPUT_COLUMNS = ['Print Time (h:mm)', 'DraftGrey (g)', 'VeroUltraWhite (g)', 'VeroBlackPlus (g)',
+                   'SUP706 (g)', 'Company Name']
+
+def convert_j826_file(input_file):
     """
-    Converts a J826 file into the desired format with consistent columns and appends the output.
+    Converts a J826 file into the desired format with consistent columns.
     
     Args:
         input_file (str): Path to the input J826 file.
-        output_file (str): Path to the output CSV file.
-        is_first_file (bool): Whether this is the first file being processed (to include headers).
+    
+    Returns:
+        dict: One output row, keyed by output column name. The print time and material
+        values are returned as read (e.g. '3h 55m', '74') and converted by process_all_j826_files.
     """
-    # Read the CSV file
-    df = pd.read_csv(input_file, header=None, names=['Key', 'Value'])
+    # Read the first column of the CSV file as UTF-8 (dropping any BOM), skipping blank and
+    # whitespace-only lines like pd.read_csv does; rows such as ',x' are kept
+    with open(input_file, newline='', encoding='utf-8-sig') as file:
+        column = [row[0] for row in csv.reader(file) if row and (len(row) > 1 or row[0].strip())]
 
     # Extract the company name from row 15 in the first column
     try:
-        company_name = df.iloc[14, 0]  # Row 15 is 14 (0-based index)
-        company_name = str(company_name).strip() if pd.notna(company_name) else "Unknown Company"
+        company_name = column[14].strip() or "Unknown Company"  # Row 15 is 14 (0-based index)
     except IndexError:
         print(f"Warning: Row 15 is missing in {input_file}. Assigning 'Unknown Company'.")
         company_name = "Unknown Company"
 
     # Restructure alternating rows into key-value pairs
-    keys = df['Key'][::2].reset_index(drop=True)  # Odd rows (keys)
-    values = df['Key'][1::2].reset_index(drop=True)  # Even rows (values)
+    keys = column[::2]  # Odd rows (keys)
+    values = column[1::2]  # Even rows (values)
     data = dict(zip(keys, values))
 
-    # Extract and process necessary values
+    # Extract necessary values
     print_time = data.get('Print Time', '0h 0m').strip()  # Example: '3h 55m'
     draft_grey = data.get('DraftGrey (g)', '0').strip()
     vero_ultra_white = data.get('VeroUltraWhite (g)', '0').strip()
     vero_black_plus = data.get('VeroBlackPlus (g)', '0').strip()
     sup706 = data.get('SUP706 (g)', '0').strip()
 
-    # Safely handle numeric conversions
-    def safe_float(value):
-        try:
-            return float(value)
-        except ValueError:
-            return 0
-
-    draft_grey = safe_float(draft_grey)
-    vero_ultra_white = safe_float(vero_ultra_white)
-    vero_black_plus = safe_float(vero_black_plus)
-    sup706 = safe_float(sup706)
-
-    # Format the print time to h:mm
-    if 'h' in print_time and 'm' in print_time:
-        print_time_split = print_time.replace('h', ':').replace('m', '').split(':')
-        formatted_time = f"{print_time_split[0]}:{print_time_split[1].zfill(2)}"
-    else:
-        formatted_time = "0:00"
-
-    # Create a new DataFrame in the desired format
-    output_df = pd.DataFrame({
-        'Print Time (h:mm)': [formatted_time],
-        'DraftGrey (g)': [draft_grey],
-        'VeroUltraWhite (g)': [vero_ultra_white],
-        'VeroBlackPlus (g)': [vero_black_plus],
-        'SUP706 (g)': [sup706],
-        'Company Name': [company_name]
-    })
-
-    # Save the new CSV file
-    if os.path.exists(output_file) and not is_first_file:
-        output_df.to_csv(output_file, mode='a', header=False, index=False)
-    else:
-        output_df.to_csv(output_file, index=False)
-    print(f"Output file saved: {os.path.abspath(output_file)}")
-    return output_df
+    # Return the row in the desired format
+    return {
+        'Print Time (h:mm)': print_time,
+        'DraftGrey (g)': draft_grey,
+        'VeroUltraWhite (g)': vero_ultra_white,
+        'VeroBlackPlus (g)': vero_black_plus,
+        'SUP706 (g)': sup706,
+        'Company Name': company_name
+    }
 
 
 def process_all_j826_files(folder_path):
     """
     Processes all J826 print job files in the specified folder and combines them into a single CSV.
+    Files already appended on an earlier run are recorded with their modification time in
+    .processed.json and skipped. If any recorded file has changed or been deleted since, or the
+    index cannot be read, the output is rebuilt from all J826 files so it always matches the
+    files present instead of double-billing edited jobs or keeping deleted ones.
     
     Args:
         folder_path (str): Path to the folder containing the J826 files.
     """
-    found_files = False  # Track if any files are found
+    rows = []  # One converted row per file found
     print(f"Scanning directory: {folder_path}")
 
-    # Define the appended output file
+    # Define the appended output file and the index of files already appended to it
     appended_file = os.path.join(folder_path, "Appended_Print_J826.csv")
-    is_first_file = not os.path.exists(appended_file)
+    processed_file = os.path.join(folder_path, ".processed.json")
 
-    for file_name in os.listdir(folder_path):
-        if "Print_J826" in file_name and file_name.endswith(".csv"):
-            input_file = os.path.join(folder_path, file_name)
-            print(f"Processing file: {file_name}")
-            convert_j826_file(input_file, appended_file, is_first_file)
-            found_files = True
-            is_first_file = False
-
-    if not found_files:
+    # The index only applies while the appended output exists; deleting it regenerates everything
+    processed = {}
+    index_unreadable = False
+    if os.path.exists(appended_file) and os.path.exists(processed_file):
+        try:
+            with open(processed_file) as file:
+                processed = json.load(file)
+        except json.JSONDecodeError:
+            processed = None
+        if not isinstance(processed, dict):
+            print(f"Warning: {processed_file} could not be read. Rebuilding the output from all files.")
+            processed = {}
+            index_unreadable = True
+
+    # Collect the new or changed J826 files in the folder, in name order; the appended output is not an input
+    with os.scandir(folder_path) as entries:
+        input_files = sorted((entry.path, entry.name, entry.stat().st_mtime) for entry in entries
+                             if entry.is_file() and "Print_J826" in entry.name and entry.name.endswith(".csv")
+                             and entry.path != appended_file)
+
+    # An edited file's old row is already in the output, and a deleted file's row should no longer be;
+    # in either case rebuild the output from every file instead of appending
+    current = {file_name: mtime for _, file_name, mtime in input_files}
+    changed = any(current.get(file_name) != mtime for file_name, mtime in processed.items())
+    if changed:
+        print("Some J826 files changed or were removed since they were appended. Rebuilding the output from all files.")
+    rebuild = changed or index_unreadable
+    if rebuild:
+        processed = {}
+
+    for input_file, file_name, mtime in input_files:
+        if processed.get(file_name) == mtime:
+            continue
+        print(f"Processing file: {file_name}")
+        rows.append(convert_j826_file(input_file))
+        processed[file_name] = mtime
+
+    if not rows and not rebuild:
         print("No new files containing 'Print_J826' found in the directory.")
+        return
+
+    # A rebuild without any remaining files still rewrites the output, leaving only the header
+    output_df = pd.DataFrame(rows, columns=_OUTPUT_COLUMNS)
+
+    # Format all print times to h:mm in one pass, e.g. '3h 55m' -> '3:55'
+    hours_minutes = output_df['Print Time (h:mm)'].str.extract(r"(\d+)h\s*(\d+)m").fillna("0")
+    output_df['Print Time (h:mm)'] = hours_minutes[0] + ":" + hours_minutes[1].str.zfill(2)
+
+    # Convert the material columns to numbers across all files at once; unparseable values become 0
+    for col in ['DraftGrey (g)', 'VeroUltraWhite (g)', 'VeroBlackPlus (g)', 'SUP706 (g)']:
+        output_df[col] = pd.to_numeric(output_df[col], errors='coerce').fillna(0.0).astype('float64')
+
+    # Stream all rows in one append (or one rewrite when rebuilding) with the csv module;
+    # the header is only written for a new file
+    write_header = rebuild or not os.path.exists(appended_file)
+    with open(appended_file, 'w' if rebuild else 'a', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file, lineterminator=os.linesep)  # Same line endings as to_csv
+        if write_header:
+            writer.writerow(output_df.columns)
+        writer.writerows(output_df.itertuples(index=False))
+    print(f"Output file saved: {os.path.abspath(appended_file)}")
+
+    # Record the appended files only once their rows are saved
+    with open(processed_file, 'w') as file:
+        json.dump(processed, file, indent=2)
 
 # Specify folder path
 folder_path = os.getcwd()  # Current working directory
@@ -1,6 +1,9 @@
+import numpy as np
 import pandas as pd
 import os
 import re
+from functools import lru_cache
+from pandas.api.types import union_categoricals
 
 # Paths to input files
 f370_file = "Appended_Print_F370.csv"
@@ -8,9 +11,24 @@ j826_file = "Appended_Print_J826.csv"
 material_cost_file = "Material_Cost.txt"
 output_file = "Print_Cost_Analysis.csv"
 
+# Material_Cost.txt line format: {printer}; {material}; {volume}; ${cost}
+_COST_RE = re.compile(r"(.*?); (.*?); (.*?); \$(.*)$")
+_NON_NUMERIC_RE = re.compile(r"[^\d.]")
+
+# Printer types of the result rows, stored as categorical codes
+_PRINTER_TYPE_DTYPE = pd.CategoricalDtype(["F370", "J826"])
+
 def parse_material_cost(file_path):
     """
     Parses the Material_Cost.txt file to extract costs and volumes for each material.
+    The result is cached until the file is modified.
+    """
+    return _parse_material_cost(file_path, os.path.getmtime(file_path))
+
+@lru_cache(maxsize=8)
+def _parse_material_cost(file_path, mtime):
+    """
+    Cached worker for parse_material_cost; mtime is only part of the cache key.
     """
     costs = {}
     with open(file_path, "r") as file:
@@ -18,10 +36,10 @@ def parse_material_cost(file_path):
             if "**" in line or line.strip() == "":
                 continue  # Ignore lines with ** or empty lines
             
-            match = re.match(r"(.*?); (.*?); (.*?); \$(.*)$", line.strip())
+            match = _COST_RE.match(line.strip())
             if match:
                 printer, material, volume, cost = match.groups()
-                volume = re.sub(r"[^\d.]", "", volume)  # Remove non-numeric characters
+                volume = _NON_NUMERIC_RE.sub("", volume)  # Remove non-numeric characters
                 volume = float(volume) if volume else None
                 cost = float(cost.replace(",", ""))  # Convert cost to float
                 costs[(printer.strip(), material.strip())] = {
@@ -30,6 +48,35 @@ def parse_material_cost(file_path):
                 }
     return costs
 
+def calculate_filament_fees(data, printer, materials, cost_per_unit):
+    """
+    Calculates the filament fee of every print job of one printer using column arithmetic.
+
+    Args:
+        data (pd.DataFrame): Print jobs read from the appended printer CSV.
+        printer (str): Printer name as used in Material_Cost.txt.
+        materials (list): (material, column name) pairs to charge for.
+        cost_per_unit (dict): Cost per unit volume keyed by (printer, material).
+
+    Returns:
+        np.ndarray: Unrounded filament fee per print job.
+    """
+    # Generate one fee expression for this printer with the costs per unit as literals,
+    # e.g. "volume_0 * 0.0321 + volume_2 * 0.0184"; missing or non-positive volumes cost nothing
+    terms = []
+    volumes = {}
+    for position, (material, col_name) in enumerate(materials):
+        key = (printer, material)
+        if col_name in data and key in cost_per_unit:
+            name = f"volume_{position}"
+            volumes[name] = data[col_name].astype("float64").fillna(0).clip(lower=0)
+            terms.append(f"{name} * {cost_per_unit[key]!r}")
+
+    # pd.eval fuses the expression into one pass (using numexpr when it is installed)
+    if not terms:
+        return np.zeros(len(data))
+    return np.asarray(pd.eval(" + ".join(terms), local_dict=volumes), dtype="float64")
+
 def calculate_costs(f370_file, j826_file, material_cost_file, output_file):
     """
     Reads the input files, calculates costs, and generates the output CSV.
@@ -37,71 +84,52 @@ def calculate_costs(f370_file, j826_file, material_cost_file, output_file):
     # Parse the material costs
     material_costs = parse_material_cost(material_cost_file)
 
-    # Read the input CSV files
-    f370_data = pd.read_csv(f370_file)
-    j826_data = pd.read_csv(j826_file)
+    # Divide cost by volume once per material; entries without a volume (flat fees) are skipped
+    cost_per_unit = {key: value["cost"] / value["volume"]
+                     for key, value in material_costs.items() if value["volume"]}
 
-    results = []
+    # Read the memory-mapped input CSV files; company names repeat across jobs, so they are parsed as categories
+    f370_data = pd.read_csv(f370_file, dtype={"Company Name": "category"}, memory_map=True)
+    j826_data = pd.read_csv(j826_file, dtype={"Company Name": "category"}, memory_map=True)
 
     # Process F370 prints
-    for idx, row in f370_data.iterrows():
-        printer = "F370"
-        company_name = row["Company Name"]
-        flat_fee = 16.25  # Flat fee for F370
-        filament_fee = 0
-
-        # Calculate costs for ABS, TPU, and Support
-        for material, col_name in [("PC-ABS BLK", "ABS in cm3"), ("TPU 92A - Black", "TPU 92A - Black"), ("QSR support", "QSR support")]:
-            if col_name in row:
-                volume = row[col_name]
-                if pd.notna(volume) and volume > 0:
-                    key = (printer, material)
-                    if key in material_costs and material_costs[key]["volume"]:
-                        cost_per_unit = material_costs[key]["cost"] / material_costs[key]["volume"]
-                        filament_fee += volume * cost_per_unit
-
-        total_fee = filament_fee + flat_fee
-        results.append({
-            "Print Job": f"Print Job {idx + 1}",
-            "Printer Type": printer,
-            "Filament Fee": round(filament_fee, 2),
-            "Flat Fee": flat_fee,
-            "Total Fee": round(total_fee, 2),
-            "Company Name": company_name
-        })
+    f370_fees = calculate_filament_fees(
+        f370_data, "F370",
+        [("PC-ABS BLK", "ABS in cm3"), ("TPU 92A - Black", "TPU 92A - Black"), ("QSR support", "QSR support")],
+        cost_per_unit)
 
     # Process J826 prints
-    for idx, row in j826_data.iterrows():
-        printer = "J826"
-        company_name = row["Company Name"]
-        flat_fee = 7.22  # Flat fee for J826
-        filament_fee = 0
-
-        # Calculate costs for materials
-        for material, col_name in [("DraftGrey", "DraftGrey (g)"), 
-                                   ("VeroUltraWhite", "VeroUltraWhite (g)"), 
-                                   ("VeroBlackPlus", "VeroBlackPlus (g)"), 
-                                   ("SUP706", "SUP706 (g)")]:
-            if col_name in row:
-                volume = row[col_name]
-                if pd.notna(volume) and volume > 0:
-                    key = (printer, material)
-                    if key in material_costs and material_costs[key]["volume"]:
-                        cost_per_unit = material_costs[key]["cost"] / material_costs[key]["volume"]
-                        filament_fee += volume * cost_per_unit
-
-        total_fee = filament_fee + flat_fee
-        results.append({
-            "Print Job": f"Print Job {len(results) + 1}",
-            "Printer Type": printer,
-            "Filament Fee": round(filament_fee, 2),
-            "Flat Fee": flat_fee,
-            "Total Fee": round(total_fee, 2),
-            "Company Name": company_name
-        })
-
-    # Create a DataFrame for the results
-    results_df = pd.DataFrame(results)
+    j826_fees = calculate_filament_fees(
+        j826_data, "J826",
+        [("DraftGrey", "DraftGrey (g)"),
+         ("VeroUltraWhite", "VeroUltraWhite (g)"),
+         ("VeroBlackPlus", "VeroBlackPlus (g)"),
+         ("SUP706", "SUP706 (g)")],
+        cost_per_unit)
+
+    # Build the result columns as arrays, F370 jobs first, then the J826 jobs
+    job_counts = [len(f370_data), len(j826_data)]
+    filament_fee = np.concatenate([f370_fees, j826_fees])
+    flat_fee = np.repeat([16.25, 7.22], job_counts)  # Flat fees for F370 and J826
+    printer_codes = np.repeat([0, 1], job_counts)  # Positions in _PRINTER_TYPE_DTYPE
+    total_fee = filament_fee + flat_fee
+    job_numbers = pd.Series(np.arange(1, len(filament_fee) + 1))
+
+    # Merge the company categories of both printers; an empty or all-blank column has object
+    # categories, so the categories are cast to str first to let union_categoricals combine them
+    companies = [data["Company Name"].cat.set_categories(data["Company Name"].cat.categories.astype(str))
+                 for data in (f370_data, j826_data)]
+
+    # Create the results DataFrame in one step
+    results_df = pd.DataFrame({
+        "Print Job": "Print Job " + job_numbers.astype(str),
+        "Printer Type": pd.Categorical.from_codes(printer_codes, dtype=_PRINTER_TYPE_DTYPE),
+        # Python's round() on the exact binary value; NumPy's rint(x * 100) / 100 can differ by a cent
+        "Filament Fee": [round(fee, 2) for fee in filament_fee.tolist()],
+        "Flat Fee": flat_fee,
+        "Total Fee": [round(fee, 2) for fee in total_fee.tolist()],
+        "Company Name": union_categoricals(companies)
+    })
 
     # Save the results to a CSV file
     results_df.to_csv(output_file, index=False)
@@ -1,21 +1,113 @@
 import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 import pandas as pd
 
-def find_matching_column(columns, keywords):
+# Column keywords per field, lowercased up front so matching never lowers them again
+_COMPANY_KWS = ("company", "companyname")
+_PRINT_TIME_KWS = ("print time", "h:mm")
+_SUPPORT_KWS = ("support", "qsr")
+_ABS_KWS = ("abs",)
+_TPU_KWS = ("tpu",)
+
+# Below this many files, starting worker processes (each re-importing pandas) costs more than it saves
+_PARALLEL_MIN_FILES = 32
+
+@lru_cache(maxsize=None)
+def _match_column(columns_lower, keywords):
+    """
+    Cached worker for find_matching_column, keyed on the lowercased column and keyword tuples
+    so files sharing a header are only scanned once. Returns the position of the match.
     """
-    Finds the first column that matches any of the given keywords.
+    pattern = re.compile("|".join(map(re.escape, keywords)))
+    mask = pd.Index(columns_lower).str.contains(pattern)
+    return int(mask.argmax()) if mask.any() else None
+
+def find_matching_column(columns, keywords, columns_lower=None):
+    """
+    Finds the first column that matches any of the given lowercase keywords.
     Matching is case-insensitive and ignores leading/trailing spaces.
+    Pass columns_lower (the columns lowercased and stripped, as a tuple) to reuse it across lookups.
+    """
+    if columns_lower is None:
+        columns_lower = tuple(col.lower().strip() for col in columns)
+    position = _match_column(columns_lower, keywords)
+    return columns[position] if position is not None else None
+
+def process_f370_file(file_path):
+    """
+    Reads one F370 print job file, detects the relevant columns and standardizes them.
+    
+    Args:
+        file_path (str): Path to the input file.
+    
+    Returns:
+        pd.DataFrame: Standardized rows of the file, or None if the file was skipped.
     """
-    for col in columns:
-        for keyword in keywords:
-            if keyword.lower() in col.lower().strip():
-                return col
-    return None
+    file_name = os.path.basename(file_path)
+    print(f"Processing file: {file_name}")
+    
+    # Read only the header so the columns can be detected before parsing any data
+    try:
+        columns = pd.read_csv(file_path, nrows=0).columns
+    except Exception as e:
+        print(f"Error reading file {file_name}: {e}")
+        return None
+    
+    # Dynamically find the columns, lowercasing the header once for all lookups
+    columns_lower = tuple(col.lower().strip() for col in columns)
+    company_name_col = find_matching_column(columns, _COMPANY_KWS, columns_lower)
+    print_time_col = find_matching_column(columns, _PRINT_TIME_KWS, columns_lower)
+    support_col = find_matching_column(columns, _SUPPORT_KWS, columns_lower)
+    abs_col = find_matching_column(columns, _ABS_KWS, columns_lower)
+    tpu_col = find_matching_column(columns, _TPU_KWS, columns_lower)
+    
+    if not company_name_col:
+        print(f"Warning: Could not find 'Company Name' column in {file_name}. Skipping file.")
+        return None
+    if not all([print_time_col, support_col]):
+        print(f"Warning: Missing one or more critical columns in {file_name}. Skipping file.")
+        print(f"Detected columns: {columns.tolist()}")
+        return None
+    
+    # Read the memory-mapped file, parsing only the detected columns; "1,054.2" style volumes are read as numbers
+    used_columns = [col for col in (company_name_col, print_time_col, support_col, abs_col, tpu_col) if col]
+    try:
+        df = pd.read_csv(file_path, header=0, usecols=used_columns, thousands=",", memory_map=True)
+    except Exception as e:
+        print(f"Error reading file {file_name}: {e}")
+        return None
+    
+    # Select the detected columns under their standard names in a single pass;
+    # an undetected material (ABS or TPU) becomes a column of zeros
+    required_columns = ["Print Time", "PC-ABS BLK", "TPU 92A - Black", "QSR support", "Company Name"]
+    source_columns = [print_time_col, abs_col, tpu_col, support_col, company_name_col]
+    detected = [(name, col) for name, col in zip(required_columns, source_columns) if col]
+    df = (df[[col for _, col in detected]]
+          .set_axis([name for name, _ in detected], axis=1)
+          .reindex(columns=required_columns, fill_value=0.0))
+    
+    # Convert the detected material volumes to numbers; missing and non-numeric cells count as 0
+    # so a bad cell never drops the whole job
+    for name, col in (("PC-ABS BLK", abs_col), ("TPU 92A - Black", tpu_col)):
+        if not col:
+            continue
+        volumes = df[name]
+        if not pd.api.types.is_numeric_dtype(volumes):
+            # A text cell keeps the column as strings, so thousands separators are still present
+            volumes = pd.to_numeric(volumes.str.replace(",", "", regex=False), errors="coerce")
+        invalid = volumes.isna() & df[name].notna()
+        if invalid.any():
+            print(f"Warning: {invalid.sum()} non-numeric value(s) in '{col}' of {file_name} counted as 0.")
+        df[name] = volumes.fillna(0) if volumes.hasnans else volumes
+    
+    return df
 
 def process_f370_files(input_folder, output_file):
     """
     Processes F370 print job files, detects relevant columns dynamically, splits filament types (ABS and TPU),
-    and combines the data into a single CSV.
+    and combines the data into a single CSV. Large batches of files are parsed in parallel across processes.
     
     Args:
         input_folder (str): Path to the folder containing the input files.
@@ -24,59 +116,31 @@ def process_f370_files(input_folder, output_file):
     Returns:
         pd.DataFrame: Combined dataset.
     """
-    combined_df = pd.DataFrame()
-    
-    # Iterate over all files in the folder
-    for file_name in os.listdir(input_folder):
-        if "_Print_F370" in file_name and file_name.endswith(".csv"):
-            file_path = os.path.join(input_folder, file_name)
-            print(f"Processing file: {file_name}")
-            
-            # Read the file
-            try:
-                df = pd.read_csv(file_path, header=0)
-            except Exception as e:
-                print(f"Error reading file {file_name}: {e}")
-                continue
-            
-            # Dynamically find the columns
-            company_name_col = find_matching_column(df.columns, ["Company", "CompanyName"])
-            print_time_col = find_matching_column(df.columns, ["Print Time", "h:mm"])
-            support_col = find_matching_column(df.columns, ["Support", "QSR"])
-            abs_col = find_matching_column(df.columns, ["ABS"])
-            tpu_col = find_matching_column(df.columns, ["TPU"])
-            
-            if not company_name_col:
-                print(f"Warning: Could not find 'Company Name' column in {file_name}. Skipping file.")
-                continue
-            if not all([print_time_col, support_col]):
-                print(f"Warning: Missing one or more critical columns in {file_name}. Skipping file.")
-                print(f"Detected columns: {df.columns.tolist()}")
-                continue
-            
-            # Initialize ABS and TPU columns
-            df["PC-ABS BLK"] = 0.0
-            df["TPU 92A - Black"] = 0.0
-            
-            # Fill ABS or TPU columns based on detected material
-            if abs_col:
-                df["PC-ABS BLK"] = df[abs_col].fillna(0)
-            if tpu_col:
-                df["TPU 92A - Black"] = df[tpu_col].fillna(0)
-            
-            # Rename other columns for consistency
-            df = df.rename(columns={
-                company_name_col: "Company Name",
-                print_time_col: "Print Time",
-                support_col: "QSR support"
-            })
-            
-            # Select and standardize required columns
-            required_columns = ["Print Time", "PC-ABS BLK", "TPU 92A - Black", "QSR support", "Company Name"]
-            df = df[required_columns]
-            
-            # Combine the data
-            combined_df = pd.concat([combined_df, df], ignore_index=True)
+    # Collect the F370 files in the folder, in name order, before parsing any of them;
+    # the combined output matches the pattern too but is not an input
+    output_path = os.path.abspath(output_file)
+    with os.scandir(input_folder) as entries:
+        file_paths = sorted(entry.path for entry in entries
+                            if entry.is_file() and "_Print_F370" in entry.name and entry.name.endswith(".csv")
+                            and os.path.abspath(entry.path) != output_path)
+    
+    # Parse large batches in parallel (map keeps the results in file order); the usual
+    # handful of files is parsed serially, which also keeps the header cache in one process
+    if len(file_paths) >= _PARALLEL_MIN_FILES:
+        with ProcessPoolExecutor(max_workers=min(len(file_paths), os.cpu_count() or 1)) as executor:
+            results = list(executor.map(process_f370_file, file_paths))
+    else:
+        results = [process_f370_file(file_path) for file_path in file_paths]
+    # Header-only files add nothing and would turn the numeric columns into object in the concat
+    frames = [df for df in results if df is not None and not df.empty]
+    
+    # Combine the data
+    combined_df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    
+    # Company names repeat across jobs; store them once as categories. This is done after
+    # the concat, which would fall back to object for per-file categories that differ
+    if not combined_df.empty:
+        combined_df["Company Name"] = combined_df["Company Name"].astype("category")
     
     # Save the combined data
     if not combined_df.empty:
@@ -87,12 +151,14 @@ def process_f370_files(input_folder, output_file):
     
     return combined_df
 
-# File paths
-input_folder = os.path.dirname(os.path.abspath(__file__))  # The current script's directory
-final_output_path = os.path.join(input_folder, "Appended_Print_F370.csv")
+# The guard keeps worker processes from re-running the script when they import it
+if __name__ == "__main__":
+    # File paths
+    input_folder = os.path.dirname(os.path.abspath(__file__))  # The current script's directory
+    final_output_path = os.path.join(input_folder, "Appended_Print_F370.csv")
 
-# Generate the final combined file
-try:
-    combined_data = process_f370_files(input_folder, final_output_path)
-except Exception as e:
-    print(f"Error during processing: {e}")
+    # Generate the final combined file
+    try:
+        combined_data = process_f370_files(input_folder, final_output_path)
+    except Exception as e:
+        print(f"Error during processing: {e}")